@@ -42,5 +42,11 @@ class BaseConfig:
     # container name.
     TF_SERVING_URL = "http://tf-server:8501/v1/models/efficientdet-d0:predict"
 
+    # Specify the maximum number of concurrent HTTP POST requests (int) the
+    # geoprocessor keeps in flight to Tensorflow Serving per image. This should be
+    # roughly 2x the num_batch_threads setting in the Tensorflow Server's
+    # batching.config file.
+    TF_SERVING_MAX_REQUESTS = 8
+
 
 api_configs = BaseConfig()
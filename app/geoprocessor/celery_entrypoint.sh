@@ -4,4 +4,4 @@ set -e
 chown -R nobody:nogroup /app_data
 
 celery -A geoprocessor.tasks.celery_app \
-    worker --loglevel=info --concurrency=1 --uid=nobody --gid=nogroup
\ No newline at end of file
+    worker --loglevel=warning --concurrency=1 --uid=nobody --gid=nogroup
\ No newline at end of file
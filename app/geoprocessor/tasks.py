@@ -1,14 +1,17 @@
 from os import getenv, listdir
-from os.path import join, splitext
+from os.path import join, splitext, getmtime
 from shutil import make_archive
+from functools import lru_cache
 import time
-import json
+import csv
 
 import asyncio
+import orjson
 import numpy as np
 from PIL import Image
 
 from celery import Celery
+from celery.utils.log import get_task_logger
 
 from configs.api_config import api_configs
 from geoprocessor.utils.object_detection import (
@@ -18,20 +21,23 @@ from geoprocessor.utils.object_detection import (
     json_keys_to_int,
     calc_max_gsd,
     downsample_to_gsd,
+    alloc_chip_buffer,
     chip_geo_image,
     unchip_geo_image,
     batch_inference,
     results_dict_to_dataframe,
     plot_bboxes_on_image,
-    collate_per_image_results,
+    iter_debris_counts,
 )
 
-print("=== TASKS.PY ===")
+logger = get_task_logger(__name__)
+
+logger.info("=== TASKS.PY ===")
 
 celery_config_module = getenv(
     "CELERY_CONFIG_MODULE", "configs.celery_config"
 )
-print(f"CELERY_CONFIG_MODULE: {celery_config_module}")
+logger.info("CELERY_CONFIG_MODULE: %s", celery_config_module)
 
 celery_app = Celery()
 celery_app.config_from_envvar("CELERY_CONFIG_MODULE")
@@ -40,6 +46,20 @@ celery_app.config_from_envvar("CELERY_CONFIG_MODULE")
 APPROVED_IMG_TYPES = api_configs.APPROVED_IMAGE_TYPES
 
 
+@lru_cache(maxsize=4)
+def _load_maps(color_map_path, label_map_path, color_map_mtime, label_map_mtime):
+    """Loads the API's color map and label map. The results are cached for the
+    lifetime of the Celery worker process, keyed on each file's modification time so
+    edits to either file are still picked up.
+    """
+    with open(color_map_path, "rb") as color_map:
+        color_map_dict = json_keys_to_int(orjson.loads(color_map.read()))
+
+    label_map_dict = read_tf_label_map(label_map_path)
+
+    return color_map_dict, label_map_dict
+
+
 @celery_app.task(name="object_detection")  # Named task
 def object_detection(task_folder):
     """
@@ -51,26 +71,37 @@ def object_detection(task_folder):
     task_paths = prep_objdetect_project(task_folder)
 
     with open(join(task_folder, "user_submission.json"), "rb") as sub:
-        user_sub = json.load(sub)
+        user_sub = orjson.loads(sub.read())
 
-    print(f"User Submission: {user_sub}")
+    logger.info("User Submission: %s", user_sub)
 
     images_to_process = [
         f for f in listdir(task_folder) if splitext(f)[1].lower() in APPROVED_IMG_TYPES
     ]
-    print(f"Images to Process: {len(images_to_process)}")
+    logger.info("Images to Process: %s", len(images_to_process))
     
     if len(images_to_process) == 0:
         # TODO: how do we flow this out to the user?
         raise Exception("No valid images found in task folder.")
-    
-    
+
+    color_map_dict, label_map_dict = _load_maps(
+        api_configs.COLOR_MAP_JSON,
+        api_configs.LABEL_MAP_PBTXT,
+        getmtime(api_configs.COLOR_MAP_JSON),
+        getmtime(api_configs.LABEL_MAP_PBTXT),
+    )
+
+    # all images share the API's chip size, so one chip buffer (sized for the largest
+    # image) is allocated up front and reused for every image in the task.
+    chip_buffer = alloc_chip_buffer(
+        [join(task_folder, f) for f in images_to_process], api_configs.CHIP_SIZE
+    )
 
     # -----------------------------
     # BEGIN INFERENCE ON EACH IMAGE
     # -----------------------------
     for current_image in images_to_process:
-        print(f"Processing: {current_image}")
+        logger.debug("Processing: %s", current_image)
 
         i_path = join(task_folder, current_image)
         i_basename, i_ext = splitext(current_image)
@@ -78,22 +109,26 @@ def object_detection(task_folder):
         # ----------------------
         # BEGIN IMAGE PROCESSING
         # ----------------------
+        # Each image is decoded exactly once. The (optionally resampled) in-memory
+        # image is chipped directly instead of being written to and re-read from disk.
         with Image.open(i_path, mode="r") as in_image:
+            # JPEGs (the common drone format) already decode as RGB, in which case
+            # the conversion (and its full-frame copy) is skipped.
             if in_image.mode != "RGB":
                 in_image = in_image.convert("RGB")
 
             # ------------------------------------------
             # DOWNSAMPLE TO API's GSD (IF USER OPTED-IN)
             # ------------------------------------------
-            preprocessed_path = i_path  # the fallback option if resampling is declined
+            processed_image = in_image  # the fallback option if resampling is declined
             if str(user_sub["resample_images"]) == "True":
-                print("Begin Downsampling...")
+                logger.debug("Begin Downsampling...")
                 # --- ESTIMATE IMAGE GSD ---
                 image_height, image_width = in_image.size
 
                 # Load sensor params
                 with open(api_configs.SUPPORTED_SENSORS_JSON, "rb") as f:
-                    supported_sensors = json.load(f)
+                    supported_sensors = orjson.loads(f.read())
                     sensor_params = prep_sensor_params(
                         supported_sensors, user_sub["sensor_platform"]
                     )
@@ -104,41 +139,32 @@ def object_detection(task_folder):
                     image_width,
                     sensor_params,
                 )
-                print(f"Estimated input image's max GSD: {max_gsd}")
+                logger.debug("Estimated input image's max GSD: %s", max_gsd)
 
                 # --- DOWNSAMPLE IMAGE TO TARGET GSD ---
-                processed_image = downsample_to_gsd(
+                resampled_image = downsample_to_gsd(
                     in_image, max_gsd, api_configs.TARGET_GSD_CM
                 )
 
-                if processed_image is not None:  # If None, the image needed upsampling
-                    preprocessed_path = join(
-                        task_paths["tmp_path"], f"{i_basename}_resample{i_ext}"
-                    )
-                    processed_image.save(preprocessed_path)
+                if resampled_image is not None:  # If None, the image needed upsampling
+                    processed_image = resampled_image
 
-                    print(
-                        f"User opted-in to downsampling. New image of size \
-                            {processed_image.size} generated from original image of \
-                            {in_image.size} and saved to {preprocessed_path}."
+                    logger.debug(
+                        "User opted-in to downsampling. New image of size %s \
+generated from original image of %s.",
+                        processed_image.size, in_image.size,
                     )
             else:
-                print(
-                    f"User declined reasampling. Using image at {preprocessed_path}"
-                )
-
-        # ----------------------------------------------
-        # CHIP "PREPROCESSED" GEO IMAGE FOR TF INFERENCE
-        # ----------------------------------------------
-        with Image.open(preprocessed_path) as in_image:
-            if in_image.mode != "RGB":
-                in_image = in_image.convert("RGB")
-
-            print(api_configs.CHIP_SIZE)
-
-            image_array = np.array(in_image, dtype=np.uint8)
+                logger.debug("User declined reasampling. Using image at %s", i_path)
+
+            # ----------------------------------------------
+            # CHIP "PREPROCESSED" GEO IMAGE FOR TF INFERENCE
+            # ----------------------------------------------
+            # an RGB PIL image is already a C-contiguous uint8 buffer, so asarray()
+            # avoids the extra full-frame copy that np.array(..., dtype) makes.
+            image_array = np.asarray(processed_image)
             chip_array, tl_array, meta_dict = chip_geo_image(
-                image_array, api_configs.CHIP_SIZE
+                image_array, api_configs.CHIP_SIZE, out=chip_buffer
             )
 
         # --------------------
@@ -148,16 +174,20 @@ def object_detection(task_folder):
         predictions = asyncio.run(
             batch_inference(
                 chip_array, api_configs.TF_SERVING_URL,
-                user_sub["confidence_threshold"], concurrency=1)
+                user_sub["confidence_threshold"], concurrency=1,
+                max_requests=api_configs.TF_SERVING_MAX_REQUESTS)
         )
         end = time.time()
 
         total_time = end - start
         time_per_chips = total_time / len(chip_array)
-        print(f"{len(predictions)} of {len(chip_array)} chips had detections.")
-        print(
-            f"All chips were processed in {total_time} seconds. \
-            This is {time_per_chips} seconds per chip."
+        logger.debug(
+            "%s of %s chips had detections.",
+            sum(p is not None for p in predictions), len(chip_array),
+        )
+        logger.debug(
+            "All chips were processed in %s seconds. This is %s seconds per chip.",
+            total_time, time_per_chips,
         )
 
         # -----------------------------
@@ -174,13 +204,10 @@ def object_detection(task_folder):
         # ----------------------------
         # PLOT RESULTS ON IMAGES, SAVE
         # ----------------------------
-        with open(api_configs.COLOR_MAP_JSON, "rb") as color_map:
-            color_map_dict = json.load(color_map, object_hook=json_keys_to_int)
-
-        label_map_dict = read_tf_label_map(api_configs.LABEL_MAP_PBTXT)
-
+        # plot on the in-memory image the bboxes were predicted on (the resampled
+        # image when the user opted-in), rather than re-decoding from disk.
         image_plot = plot_bboxes_on_image(
-            i_path, final_results_dict[i_basename], color_map_dict, label_map_dict
+            image_array, final_results_dict[i_basename], color_map_dict, label_map_dict
         )
 
         out_image_path = join(
@@ -188,7 +215,7 @@ def object_detection(task_folder):
         )
 
         image_plot.save(out_image_path)
-        print(f"Wrote {out_image_path}")
+        logger.debug("Wrote %s", out_image_path)
 
         # -----------------
         # SAVE JSON RESULTS
@@ -196,8 +223,13 @@ def object_detection(task_folder):
         json_results_path = join(
             task_paths["per_results_path"], f"{i_basename}_debris_objects.json"
         )
-        with open(json_results_path, mode="w", encoding="utf-8") as outfile:
-            json.dump(final_results_dict, outfile, indent=3)
+        with open(json_results_path, mode="wb") as outfile:
+            outfile.write(
+                orjson.dumps(
+                    final_results_dict,
+                    option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2,
+                )
+            )
 
         # ----------------
         # SAVE CSV RESULTS
@@ -209,26 +241,23 @@ def object_detection(task_folder):
             task_paths["per_results_path"], f"{i_basename}_debris_objects.csv"
         )
         results_df.to_csv(csv_results_path, index=False)
-        print(f"Wrote {csv_results_path}")
+        logger.debug("Wrote %s", csv_results_path)
 
-        print(f"Completed processing of {current_image}.")
+        logger.debug("Completed processing of %s.", current_image)
 
     # --------------------------------------------
     # COLLATE ALL IMAGE RESULTS INTO BATCH RESULTS
     # --------------------------------------------
-    print("Completed processing of all images! Collating final results...")
-
-    final_results_df, final_counts_series = collate_per_image_results(
-        task_paths["per_results_path"]
-    )
+    logger.info("Completed processing of all images! Collating final results...")
 
     final_df_path = join(task_paths["results_path"], "all_debris_objects.csv")
-    final_results_df.to_csv(final_df_path, index=False)
-
     final_counts_path = join(task_paths["results_path"], "debris_type_counts.csv")
-    final_counts_series.to_csv(
-        final_counts_path, index_label=["class"], header=["count"]
-    )
+    with open(final_counts_path, "w", newline="") as final_counts_file:
+        counts_writer = csv.writer(final_counts_file, lineterminator="\n")
+        counts_writer.writerow(["class", "count"])
+        counts_writer.writerows(
+            iter_debris_counts(task_paths["per_results_path"], final_df_path)
+        )
 
     # ZIP + RETURN RESULT
     zip_no_ext = join(task_folder, "inference_results")
@@ -236,6 +265,6 @@ def object_detection(task_folder):
 
     zipped_api_results = zip_no_ext + ".zip"
 
-    print(f"Finished! Final results are ready at {zip_no_ext}.zip")
+    logger.info("Finished! Final results are ready at %s", zipped_api_results)
 
     return zipped_api_results
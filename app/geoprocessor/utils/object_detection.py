@@ -2,14 +2,21 @@
 pre-/post-processing of both georeferenced and non-georeferenced object detection
 results."""
 
-from os import listdir, mkdir
-from os.path import join, exists
+from os import scandir, makedirs, cpu_count
+from os.path import join
 import math
 import json
 import csv
+import re
+from itertools import accumulate
+from collections import Counter
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import logging
 
 import asyncio
 import aiohttp
+import orjson
 
 import numpy as np
 import pandas as pd
@@ -18,6 +25,13 @@ from PIL import Image
 from PIL import ImageDraw
 from PIL import ImageFont
 
+logger = logging.getLogger(__name__)
+
+# patterns for parsing Tensorflow Object Detection API label maps (pbtxt files).
+_LABEL_MAP_ITEM_RE = re.compile(r"item\s*\{(.*?)\}", re.DOTALL)
+_LABEL_MAP_ID_RE = re.compile(r"\bid\s*:\s*(\d+)")
+_LABEL_MAP_NAME_RE = re.compile(r"\bname\s*:\s*['\"]?([^'\"\n]+)['\"]?")
+
 
 def prep_objdetect_project(task_path):
     """A simple function designed to create the necessary directories for API
@@ -33,20 +47,17 @@ def prep_objdetect_project(task_path):
 
     """
     # Create an directory to store the API's intermediate processing files.
+    # makedirs(exist_ok=True) is a single mkdir call per directory, and avoids the
+    # race between a separate exists() check and the mkdir().
     tmp_path = join(task_path, "tmp")
-    if not exists(tmp_path):
-        mkdir(tmp_path)
+    makedirs(tmp_path, exist_ok=True)
 
     # Create a directory to store final results along with two sub-directories. One
     # for per-image plots, another for per-image tabular results (such as CSV and
     # JSON files).
     results_path = join(task_path, "api_results")
-    if not exists(results_path):
-        mkdir(results_path)
-
     per_results_path = join(results_path, "per_image_results")
-    if not exists(per_results_path):
-        mkdir(per_results_path)
+    makedirs(per_results_path, exist_ok=True)
 
     task_paths = {
         'tmp_path': tmp_path,
@@ -57,7 +68,7 @@ def prep_objdetect_project(task_path):
     return task_paths
 
 
-def ndv_check(chip: np.ndarray, verbose=False) -> bool:
+def ndv_check(chip: np.ndarray, verbose=False, max_value=None) -> bool:
     """This function checks to see if the chip is potentially composed of all NDV values
     and returns either 'True' or 'False'. This is useful for filtering 'blank' chips
     before costly processing operations.
@@ -74,8 +85,12 @@ def ndv_check(chip: np.ndarray, verbose=False) -> bool:
     Inputs:
       - chip: an np.ndarray. Most likely a single chip from the array generated by the
         chip_geo_image() function.
-      - verbose: a boolean. If True, the function will print the results of each
-        chip evaulation.
+      - verbose: a boolean. If True, the function will log (at DEBUG level) the
+        results of each chip evaulation.
+      - max_value (optional, default=None): the max value for the chip's dtype. If
+        None, it is looked up via np.iinfo. Since the dtype is constant across all
+        chips of an image, callers checking many chips should look this up once and
+        pass it in.
 
     Returns:
       - is_ndv: a True or False (bool) value indicating whether the chip is a 'blank'
@@ -84,30 +99,141 @@ def ndv_check(chip: np.ndarray, verbose=False) -> bool:
 
     # NOTE: This may break for float rasters. np.iinfo only works for
     # dtype int (np.finfo for floats)
-    max_value = np.iinfo(chip.dtype).max
+    if max_value is None:
+        max_value = np.iinfo(chip.dtype).max
 
     if verbose is True:
-        print(f"max_value for chip's dtype of {chip.dtype} is {max_value}.")
+        logger.debug("max_value for chip's dtype of %s is %s.", chip.dtype, max_value)
 
-    maxes = np.ones_like(chip, dtype=chip.dtype) * max_value
-    zeros = np.zeros_like(chip, dtype=chip.dtype)
+    # two scalar reductions instead of building full-size comparison arrays. A chip
+    # is all zeros if its max is 0, and all max_value if its min is max_value (the
+    # min is only computed when the max already equals max_value).
+    chip_max = chip.max()
 
     is_ndv = False
-    if np.array_equal(maxes, chip) is True or np.array_equal(zeros, chip):
+    if chip_max == 0 or (chip_max == max_value and chip.min() == max_value):
         if verbose is True:
-            print("NDV Chip.")
+            logger.debug("NDV Chip.")
         is_ndv = True
     else:
         if verbose is True:
-            print("Valid Chip.")
+            logger.debug("Valid Chip.")
         is_ndv = False
 
     return is_ndv
 
 
+def alloc_chip_buffer(image_paths, kernel_size, channels=3, dtype=np.uint8):
+    """Preallocates a single chip buffer large enough to hold the chips of the largest
+    image in image_paths. Since every image in a task is chipped with the same kernel
+    size, this buffer can be handed to chip_geo_image() (via its 'out' parameter) for
+    each image, avoiding a fresh multi-hundred MB allocation per image.
+
+    Only the image headers are read to determine each image's size. Resampling only
+    ever shrinks an image, so the original sizes are a safe upper bound.
+
+    Inputs:
+    - image_paths: A list of paths to the images that will be chipped.
+    - kernel_size: a tuple of the form (height, width) that defines the chip size.
+    - channels (optional, default=3): the number of channels of each chip.
+    - dtype (optional, default=np.uint8): the dtype of the chips.
+
+    Returns:
+    - chip_buffer: an uninitialized np.ndarray of shape
+      (max_num_chips, chip_height, chip_width, channels).
+    """
+    tile_height, tile_width = kernel_size
+
+    max_num_chips = 0
+    for image_path in image_paths:
+        with Image.open(image_path) as in_image:  # lazy, only the header is read
+            img_width, img_height = in_image.size
+
+        num_chips = math.ceil(img_height / tile_height) * math.ceil(img_width / tile_width)
+        max_num_chips = max(max_num_chips, num_chips)
+
+    return np.empty((max_num_chips, tile_height, tile_width, channels), dtype=dtype)
+
+
+def _morton_order(num_rows, num_cols):
+    """Returns the raster (row-major) indices of a num_rows x num_cols grid sorted
+    into Morton (Z-order) by interleaving the bits of each cell's row and column.
+    Rows and columns are limited to 16 bits (65,535 cells) each.
+    """
+
+    def _spread_bits(values):
+        values = values.astype(np.uint32) & 0x0000FFFF
+        values = (values | (values << 8)) & 0x00FF00FF
+        values = (values | (values << 4)) & 0x0F0F0F0F
+        values = (values | (values << 2)) & 0x33333333
+        values = (values | (values << 1)) & 0x55555555
+        return values
+
+    rows, cols = np.divmod(np.arange(num_rows * num_cols), num_cols)
+    morton_codes = (_spread_bits(rows) << 1) | _spread_bits(cols)
+
+    return np.argsort(morton_codes, kind="stable")
+
+
+def _ndv_mask(tiled_array, chip_rows, chip_cols):
+    """Returns a boolean mask flagging which of the given chips of a tiled image view
+    (shape [num_height_chips, num_width_chips, chip_height, chip_width, channels])
+    contain only 0s or only the dtype's max value (see ndv_check()).
+    """
+
+    max_value = np.iinfo(tiled_array.dtype).max
+
+    # a chip can only be all 0s or all max_value if its first value is, so the full
+    # max/min reductions are only run on (a copy of) those candidate chips.
+    first_values = tiled_array[chip_rows, chip_cols, 0, 0, 0]
+    candidates = np.flatnonzero((first_values == 0) | (first_values == max_value))
+
+    is_ndv = np.zeros(len(chip_rows), dtype=bool)
+    if len(candidates) > 0:
+        candidate_chips = tiled_array[
+            chip_rows[candidates], chip_cols[candidates]
+        ].reshape(len(candidates), -1)
+        is_ndv[candidates] = (candidate_chips.max(axis=1) == 0) | (
+            candidate_chips.min(axis=1) == max_value
+        )
+
+    return is_ndv
+
+
+def _pad_edge_chips(image, kernel_size, nodata_value):
+    """Builds the chips along the bottom/right edges of an image that only partially
+    overlap it, padding the rest of each chip with the NDV. Returns a dictionary
+    mapping each edge chip's (row, col) tile index to its chip array. The dictionary
+    is empty when the image is an exact multiple of the kernel size.
+    """
+
+    img_height, img_width, channels = image.shape
+    tile_height, tile_width = kernel_size
+    num_height_tiles = math.ceil(img_height / tile_height)
+    num_width_tiles = math.ceil(img_width / tile_width)
+
+    edge_tiles = set()
+    if img_height % tile_height != 0:
+        edge_tiles.update((num_height_tiles - 1, col) for col in range(num_width_tiles))
+    if img_width % tile_width != 0:
+        edge_tiles.update((row, num_width_tiles - 1) for row in range(num_height_tiles))
+
+    edge_chips = {}
+    for row, col in sorted(edge_tiles):
+        image_part = image[
+            row * tile_height : (row + 1) * tile_height,
+            col * tile_width : (col + 1) * tile_width,
+        ]
+        chip = np.full((tile_height, tile_width, channels), nodata_value, image.dtype)
+        chip[: image_part.shape[0], : image_part.shape[1]] = image_part
+        edge_chips[(row, col)] = chip
+
+    return edge_chips
+
+
 def chip_geo_image(
     image: np.ndarray, kernel_size: tuple, nodata_value=0, thin_nodata_chips=False,
-    on_disk_path="None",
+    on_disk_path="None", out=None, chip_order="raster",
 ) -> tuple:
     """This is an ultra-fast, full-featured chipping function adapted from this article:
     https://towardsdatascience.com/efficiently-splitting-an-image-into-tiles-in-python-using-numpy-d1bf0dd7b6f7
@@ -147,6 +273,14 @@ def chip_geo_image(
       will write the image chips and their metadata to disk. The chips will not be
       saved in RAM.  This is useful for large images that are too large to fit in
       the host machine's memory.
+    - out: a np.ndarray (optional, default=None). A preallocated chip buffer (see
+      alloc_chip_buffer()) of shape [max_chips, chip_height, chip_width,
+      chip_channels]. If given, the chips are written into this buffer and the
+      returned single_index_array is a view of it, so the buffer can be reused
+      across images instead of allocating a new chip array each time.
+    - chip_order: a string (optional, default='raster'). Either 'raster' (row by row)
+      or 'morton' (Z-order). Morton order keeps spatially neighboring chips close
+      together in the chip array (and therefore in the same inference batches).
 
     Returns:
     - returns: a 3-item Tuple with either file paths or in-memory files:
@@ -167,50 +301,116 @@ def chip_geo_image(
       - meta_path: a string. The path to a JSON file containing the metadata dictionary.
     """
 
+    if chip_order not in ("raster", "morton"):
+        raise ValueError(
+            f"chip_order must be either 'raster' or 'morton', not {chip_order!r}."
+        )
+
     img_height, img_width, channels = image.shape
     tile_height, tile_width = kernel_size
 
     # determine the number of chips in each direction
     num_height_tiles = math.ceil(img_height / tile_height)
     num_width_tiles = math.ceil(img_width / tile_width)
-    print(
-        f"Input kernel size of {kernel_size} will result in \
-        {num_height_tiles * num_width_tiles} output image chips..."
+    logger.debug(
+        "Input kernel size of %s will result in %s output image chips...",
+        kernel_size, num_height_tiles * num_width_tiles,
     )
 
-    # determine how much padding is needed
-    height_pad = (tile_height * num_height_tiles) - img_height
-    width_pad = (tile_width * num_width_tiles) - img_width
-
-    # pad the image with a constant value that matches NDV
-    padded_image = np.pad(
-        image,
-        [(0, height_pad), (0, width_pad), (0, 0)],
-        mode="constant",
-        constant_values=nodata_value,
-    )
+    # chips lying entirely within the image are taken straight from a strided
+    # (num_height_chips, num_width_chips, height, width, channels) view of it. Only
+    # the bottom/right edge chips, which are padded with the NDV, are built
+    # separately, so the image itself is never copied into a padded image.
+    full_height_tiles = img_height // tile_height
+    full_width_tiles = img_width // tile_width
 
     # this is where the "real" magic happens.
-    tiled_array = padded_image.reshape(
-        num_height_tiles, tile_height, num_width_tiles, tile_width, channels
-    )
+    tiled_array = image[
+        : full_height_tiles * tile_height, : full_width_tiles * tile_width
+    ].reshape(full_height_tiles, tile_height, full_width_tiles, tile_width, channels)
     tiled_array = tiled_array.swapaxes(1, 2)
 
-    # reshape the chip array so all image chips are along a single axis.
-    # This will reshape to our final shape of:
+    edge_chips = _pad_edge_chips(image, kernel_size, nodata_value)
+
+    # the (row, col) tile index of each output chip. These stay None when every chip
+    # is kept in raster order, which allows the cheaper block copy below.
+    num_chips = num_height_tiles * num_width_tiles
+    chip_rows = chip_cols = None
+    if chip_order == "morton":
+        chip_rows, chip_cols = np.divmod(
+            _morton_order(num_height_tiles, num_width_tiles), num_width_tiles
+        )
+
+    # optionally thin the chips that only contain only NDV values across all 3 bands.
+    # Rather than calling ndv_check() chip by chip, the same max/min test is run on
+    # the tiled view before any chips are copied, so thinned chips are never
+    # materialized.
+    idxs_to_delete = []
+    if thin_nodata_chips is True:
+        if chip_rows is None:
+            chip_rows, chip_cols = np.divmod(np.arange(num_chips), num_width_tiles)
+
+        is_edge = (chip_rows >= full_height_tiles) | (chip_cols >= full_width_tiles)
+        is_ndv = np.zeros(num_chips, dtype=bool)
+        is_ndv[~is_edge] = _ndv_mask(
+            tiled_array, chip_rows[~is_edge], chip_cols[~is_edge]
+        )
+        is_ndv[is_edge] = [
+            ndv_check(edge_chips[(row, col)])
+            for row, col in zip(chip_rows[is_edge], chip_cols[is_edge])
+        ]
+        idxs_to_delete = np.flatnonzero(is_ndv).tolist()
+
+        chip_rows, chip_cols = chip_rows[~is_ndv], chip_cols[~is_ndv]
+        logger.debug(
+            "Thinned %s NDV chips. Total number of chips after thinning: %s.",
+            len(idxs_to_delete), len(chip_rows),
+        )
+
+    # copy the chips into an array with all image chips along a single axis, of shape:
     # (num_chips, kernel height, kernel width, image channels).
-    single_index_array = tiled_array.reshape(-1, *(tile_height, tile_width, channels))
+    num_out_chips = num_chips if chip_rows is None else len(chip_rows)
+    if out is None:
+        single_index_array = np.empty(
+            (num_out_chips, tile_height, tile_width, channels), dtype=image.dtype
+        )
+    else:
+        if (
+            out.shape[0] < num_out_chips
+            or out.shape[1:] != (tile_height, tile_width, channels)
+        ):
+            raise ValueError(
+                f"Chip buffer of shape {out.shape} cannot hold {num_out_chips} chips \
+of shape {(tile_height, tile_width, channels)}."
+            )
+
+        # copy the chips straight into the caller's buffer (a view, no new array)
+        single_index_array = out[:num_out_chips]
+
+    if chip_rows is None:
+        single_index_array.reshape(
+            num_height_tiles, num_width_tiles, tile_height, tile_width, channels
+        )[:full_height_tiles, :full_width_tiles] = tiled_array
+        for (row, col), chip in edge_chips.items():
+            single_index_array[row * num_width_tiles + col] = chip
+    else:
+        for i, (row, col) in enumerate(zip(chip_rows, chip_cols)):
+            if (row, col) in edge_chips:
+                single_index_array[i] = edge_chips[(row, col)]
+            else:
+                single_index_array[i] = tiled_array[row, col]
 
     # down the road we may need to reshape the chips back into the padded image.
     # Here we compile a 'metadata dictionary' to potentially help with that process.
     meta_dict = {
-        "padded_image_height": padded_image.shape[0],
-        "padded_image_width": padded_image.shape[1],
+        "padded_image_height": num_height_tiles * tile_height,
+        "padded_image_width": num_width_tiles * tile_width,
         "num_height_chips": num_height_tiles,
         "num_width_chips": num_width_tiles,
         "chip_height": tile_height,
         "chip_width": tile_width,
         "channels": channels,
+        "chip_order": chip_order,
     }
 
     # it may also be helpful to be able to associate each chip's top left
@@ -219,39 +419,25 @@ def chip_geo_image(
     # single_index_array.
     # Note that values for these are capped as uint32s(0 to 65,535 pixels) to
     # avoid memory issues.
-    tops = np.array(
-        [y * tile_height for y in range(0, num_height_tiles)], dtype=np.uint32
-    )
-    lefts = np.array(
-        [x * tile_width for x in range(0, num_width_tiles)], dtype=np.uint32
-    )
-
-    tl_pairs = []
-    for top in tops:
-        for left in lefts:
-            new_pair = (top, left)
-            tl_pairs.append(new_pair)
-
-    tl_array = np.asarray(tl_pairs, dtype=np.uint32)
-
-    # optionally thin the chips that only contain only NDV values across all 3 bands.
-    # Also thin the associated tl_array.
-    if thin_nodata_chips is True:
-        idxs_to_delete = []
-        for i, chip in enumerate(single_index_array):
-            if ndv_check(chip) is True:
-                idxs_to_delete.append(i)
-
-        single_index_array = np.delete(single_index_array, idxs_to_delete, axis=0)
-        tl_array = np.delete(tl_array, idxs_to_delete, axis=0)
-        print(
-            f"Thinned {len(idxs_to_delete)} NDV chips. \
-          Total number of chips after thinning: {len(single_index_array)}."
+    if chip_rows is None:
+        tops, lefts = np.meshgrid(
+            np.arange(num_height_tiles, dtype=np.uint32) * tile_height,
+            np.arange(num_width_tiles, dtype=np.uint32) * tile_width,
+            indexing="ij",
+        )
+        tl_array = np.stack([tops.ravel(), lefts.ravel()], axis=1)
+    else:
+        tl_array = np.stack(
+            [
+                chip_rows.astype(np.uint32) * tile_height,
+                chip_cols.astype(np.uint32) * tile_width,
+            ],
+            axis=1,
         )
 
-    print(
-        f"Geospatial chipping operation complete. \
-      Final chipped array shape: {single_index_array.shape}"
+    logger.debug(
+        "Geospatial chipping operation complete. Final chipped array shape: %s",
+        single_index_array.shape,
     )
 
     # if operating in "on-disk" mode, write the outputs to disk.
@@ -259,14 +445,20 @@ def chip_geo_image(
         # TODO: use rio to also save geo-coding? Need to test speed...
         # write chips to individual image files
 
-        chip_paths = []
-        for i in range(0, single_index_array.shape[0]):
-            chip_name = f"{i}.tif"
-            chip_path = join(on_disk_path, chip_name)
-            chip_paths.append(chip_path)
+        chip_paths = [
+            join(on_disk_path, f"{i}.tif") for i in range(single_index_array.shape[0])
+        ]
 
-            Image.fromarray(single_index_array[i]).save(chip_path)
-            # print(f"Wrote chip {i} to disk at location {chip_path}")
+        # the chip writes are independent and PIL's encoders release the GIL, so
+        # they are spread over a thread pool rather than written one at a time.
+        with ThreadPoolExecutor(max_workers=cpu_count()) as executor:
+            list(
+                executor.map(
+                    lambda chip, chip_path: Image.fromarray(chip).save(chip_path),
+                    single_index_array,
+                    chip_paths,
+                )
+            )
 
         # add some additional info and write meta_dict to disk
         meta_dict["num_thinned"] = len(idxs_to_delete)
@@ -277,14 +469,8 @@ def chip_geo_image(
             json.dump(meta_dict, out_file)
 
         # write the TL pairs and a field header to CSV
-        fields = ["y", "x"]
-        rows = tl_array.tolist()
-
         tl_path = join(on_disk_path, "chip_toplefts.csv")
-        with open(tl_path, mode="w", encoding="utf-8") as out_file:
-            write = csv.writer(out_file)
-            write.writerow(fields)
-            write.writerows(rows)
+        np.savetxt(tl_path, tl_array, fmt="%d", delimiter=",", header="y,x", comments="")
 
         # If operating "on-disk", return the paths to each written file
         returns = (chip_paths, tl_path, meta_path)
@@ -296,48 +482,58 @@ def chip_geo_image(
 
 
 def unchip_geo_image(
-    img_basename, inference_results_dict, toplefts_array, chip_height, chip_width
+    img_basename, inference_results, toplefts_array, chip_height, chip_width
 ):
     """This function reassembles the chipped results received from Tensorflow Serving.
     The reassembly requires the TF Server's inference results in addition to the
     metadata about the chipping operation (outputs from chip_geo_image()).
     Inputs:
     - img_basename: A string representing the original image's filename (no extension).
-    - inference_results_dict: A dictionary containing the multi-class object detection
-        results from TF Serving.
+    - inference_results: A list containing the multi-class object detection results
+        from TF Serving (one entry per chip, None for chips without predictions).
+        This is generated by the batch_inference() function.
     - toplefts_array: A numpy array containing the topleft coordinates of each chip,
         this is generated by the chip_geo_image() function.
     - chip_height: An integer representing the height of the chip in pixels.
     - chip_width: An integer representing the width of the chip in pixels.
     Returns:
     - merged_results_dict: A dictionary containing the reassembled inference results
-        from TF Serving.
+        from TF Serving. The bboxes are given as a np.ndarray of int32s of shape
+        (num_bboxes, 4), the scores as a float32 np.ndarray and the classes as a
+        uint8 np.ndarray (each of shape (num_bboxes,)).
     """
 
     merged_results_dict = {}
-    new_bboxes = []
-    new_scores = []
-    new_classes = []
-
-    for i, i_results in inference_results_dict.items():
-        y_offset = toplefts_array[i][0]
-        x_offset = toplefts_array[i][1]
-
-        for normalized_bbox in i_results["detection_boxes"]:
-            bbox = _denormalize_coordinates(normalized_bbox, chip_height, chip_width)
-            new_bbox = (
-                int(y_offset + bbox[0]),
-                int(x_offset + bbox[1]),
-                int(y_offset + bbox[2]),
-                int(x_offset + bbox[3]),
-            )
-            new_bboxes.append(new_bbox)
 
-        for score in i_results["detection_scores"]:
-            new_scores.append(score)
-
-        for classes in i_results["detection_classes"]:
-            new_classes.append(classes)
+    chip_idxs = []
+    chip_bboxes = []
+    chip_scores = []
+    chip_classes = []
+    bbox_counts = []
+    for i, i_results in enumerate(inference_results):
+        if i_results is None:
+            continue
+
+        chip_idxs.append(i)
+        chip_bboxes.append(i_results["detection_boxes"])
+        chip_scores.append(i_results["detection_scores"])
+        chip_classes.append(i_results["detection_classes"])
+        bbox_counts.append(len(i_results["detection_scores"]))
+
+    if len(chip_idxs) > 0:
+        # denormalize every chip's bboxes in a single call, then shift them from chip
+        # to image pixel space with one (ymin, xmin, ymax, xmax) offset row per bbox.
+        chip_offsets = np.asarray(toplefts_array, dtype=np.int32)[chip_idxs]
+        offsets = np.tile(np.repeat(chip_offsets, bbox_counts, axis=0), 2)
+        new_bboxes = _denormalize_coordinates(
+            np.concatenate(chip_bboxes), chip_height, chip_width
+        ) + offsets
+        new_scores = np.concatenate(chip_scores).astype(np.float32, copy=False)
+        new_classes = np.concatenate(chip_classes).astype(np.uint8, copy=False)
+    else:
+        new_bboxes = np.empty((0, 4), dtype=np.int32)
+        new_scores = np.empty(0, dtype=np.float32)
+        new_classes = np.empty(0, dtype=np.uint8)
 
     merged_results_dict[img_basename] = {
         "bboxes": new_bboxes,
@@ -348,82 +544,103 @@ def unchip_geo_image(
     return merged_results_dict
 
 
-async def _async_post(session, url, batch, i, results, raw_conf_threshold=0.0):
+async def _async_post(
+    session, semaphore, url, batch, i, results, raw_conf_threshold=0.0
+):
     """An async function for submitting batches of image chips to a TensorFlow
     Serving server using the HTTP POST method.
     This function also employs memory-saving features. Specifically:
       1. Only the predictions' score, class, and bounding box are saved.
-      2. The dypes of each prediction are dropped (where applicable).
+      2. Each prediction is stored as a compact numpy array (float32 scores, uint8
+         classes).
       3. The predictions are filtered by a user-specified confidence threshold.
          Any prediction below this threshold is dropped.
     Setting conf_threshold=0.0 would skip the filtering of predictions, while
     preserving the other memory-saving features.
     Inputs:
     - session: the aiohttp.ClientSession object used to make the POST request
+    - semaphore: an asyncio.Semaphore bounding how many requests (and their encoded
+      payloads) are in flight at once.
     - url: the URL of the TensorFlow Serving server
     - batch: the image chip batch to be submitted as a numpy array of
       dimension (num_chips, height, width, channels)
     - i: the current chip index (needed to reassemble the predictions)
-    - results: a Python dictionary into which results are appended in form of:
-      {[i]: {['detection_score']:[...],
-              ['detection_class']:[...],
-              ['detection_bbox']:[...]},
-        ...}
+    - results: a preallocated Python list (one slot per batch) into which results
+      are stored in form of:
+      [{['detection_score']:[...],
+        ['detection_class']:[...],
+        ['detection_bbox']:[...]},
+        None,  # no predictions above the confidence threshold
+        ...]
     - conf_threshold (optional, default=0.0): the confidence threshold to
       use for filtering predictions (0.0 to 1.0).
     Returns:
-     - NONE (but the results dictionary is updated with each chip's inference results)
+     - NONE (but the results list is updated with each chip's inference results)
     """
 
     conf_threshold = float(raw_conf_threshold)
-    async with session.post(
-        url, json={"signature_name": "serving_default", "instances": batch.tolist()}
-    ) as resp:
-        pred = await resp.json()
-
-        if "predictions" in pred:
-            cats = pred["predictions"][0]
-
-            # filter the predictions based on confidence score
-            # (and drop the dtypes to save memory)
-            scores_np = np.array(cats["detection_scores"], dtype=np.float16)
-            filtered_scores = scores_np[scores_np >= conf_threshold].tolist()
-
-            if len(filtered_scores) > 0:
-                print(
-                    f"{i} has {len(filtered_scores)} predictions above \
-                    confidence threshold of {conf_threshold}."
-                )
 
-                formatted_prediction = {}
-                filtered_classes = (
-                    np.array(cats["detection_classes"])[scores_np >= conf_threshold]
-                    .astype("uint8")
-                    .tolist()
-                )
-                # print(f"{i}: filtered classes: {len(filtered_classes)}")
-
-                filtered_bboxes = np.array(cats["detection_boxes"])[
-                    scores_np >= conf_threshold
-                ].tolist()
+    # the payload is only encoded once a request slot is free, which bounds peak
+    # memory to max_requests encoded batches.
+    async with semaphore:
+        # orjson encodes the uint8 ndarray straight from its buffer, avoiding the
+        # nested Python lists (and stdlib JSON encoding) of batch.tolist(). The
+        # model's serving signature takes a raw uint8 image tensor, so the payload
+        # stays JSON.
+        payload = orjson.dumps(
+            {
+                "signature_name": "serving_default",
+                "instances": np.ascontiguousarray(batch),
+            },
+            option=orjson.OPT_SERIALIZE_NUMPY,
+        )
+        async with session.post(
+            url, data=payload, headers={"Content-Type": "application/json"}
+        ) as resp:
+            pred = orjson.loads(await resp.read())
+
+    if "predictions" in pred:
+        cats = pred["predictions"][0]
+
+        # filter the predictions based on confidence score. The mask is computed
+        # once and reused for every field. With a threshold of 0.0 nothing can be
+        # filtered, so the masking is skipped entirely.
+        scores_np = np.asarray(cats["detection_scores"], dtype=np.float32)
+        if conf_threshold > 0.0:
+            keep = scores_np >= conf_threshold
+        else:
+            keep = slice(None)
+        filtered_scores = scores_np[keep]
 
-                # print(f"{i}: filtered bboxes: {len(filtered_bboxes)}")
+        if len(filtered_scores) > 0:
+            logger.debug(
+                "%s has %s predictions above confidence threshold of %s.",
+                i, len(filtered_scores), conf_threshold,
+            )
 
-                formatted_prediction["detection_scores"] = filtered_scores
-                formatted_prediction["detection_classes"] = filtered_classes
-                formatted_prediction["detection_boxes"] = filtered_bboxes
-                results[i] = formatted_prediction
+            # the filtered predictions are kept as (compact) numpy arrays, which
+            # unchip_geo_image() consumes directly.
+            results[i] = {
+                "detection_scores": filtered_scores,
+                "detection_classes": np.asarray(
+                    cats["detection_classes"]
+                )[keep].astype(np.uint8),
+                "detection_boxes": np.asarray(cats["detection_boxes"])[keep],
+            }
 
-            else:
-                print(
-                    f"{i} had predictions, but they were all below the confidence threshold of {conf_threshold}."
-                )
         else:
-            print(f"No predictions at all for {i}.")
-            print(f"{i}: {pred['error']}")
+            logger.debug(
+                "%s had predictions, but they were all below the confidence \
+threshold of %s.",
+                i, conf_threshold,
+            )
+    else:
+        logger.warning("No predictions at all for %s: %s", i, pred["error"])
 
 
-async def batch_inference(instances, tf_serving_url, conf_threshold, concurrency=1):
+async def batch_inference(
+    instances, tf_serving_url, conf_threshold, concurrency=1, max_requests=8
+):
     """An async function for performing client-side batch inference on a set of
     image chips.
     Concurrency controls how many image chips are provided to the Tensorflow Server
@@ -445,25 +662,41 @@ async def batch_inference(instances, tf_serving_url, conf_threshold, concurrency
     - concurrency: the number of batches to split the numpy array into to
         provide as concurrent requests to the TensorFlow Serving server.
         As of 3/25/2022, this value is a placeholder and should be set to 1.
+    - max_requests (optional, default=8): the maximum number of HTTP POST requests
+        in flight at once. This bounds both the number of open connections to the
+        TensorFlow Server and the number of encoded payloads held in memory. A good
+        starting point is 2x the server's num_batch_threads.
      Outputs:
-    - predictions: a dictionary containing the raw, multi-class object detection
-        inference results for the current batch of chips.
+    - predictions: a list (one entry per batch) containing the raw, multi-class
+        object detection inference results for each batch of chips, or None for
+        batches without predictions above the confidence threshold.
     """
 
     num_batches = math.ceil(len(instances) / concurrency)
-    print(f"Number of batches: {num_batches}")
-    batches = np.array_split(instances, num_batches)
+    logger.debug("Number of batches: %s", num_batches)
+
+    # basic slicing along the chip axis yields views of the chip array, so (unlike
+    # np.array_split) no batch is ever copied.
+    batches = (
+        instances[start:start + concurrency]
+        for start in range(0, len(instances), concurrency)
+    )
 
     conf_thresh_flt = float(int(conf_threshold) / 100)
 
-    predictions = {}
-    async with aiohttp.ClientSession() as session:
+    # integer-indexed results go into a preallocated list rather than a dict.
+    predictions = [None] * num_batches
+
+    semaphore = asyncio.Semaphore(max_requests)
+    connector = aiohttp.TCPConnector(limit=max_requests)
+    async with aiohttp.ClientSession(connector=connector) as session:
         await asyncio.gather(
             *[
                 _async_post(
-                    session, tf_serving_url, batches[i], i, predictions, conf_thresh_flt
+                    session, semaphore, tf_serving_url, batch, i, predictions,
+                    conf_thresh_flt,
                 )
-                for i in range(len(batches))
+                for i, batch in enumerate(batches)
             ]
         )
 
@@ -553,54 +786,65 @@ def downsample_to_gsd(input_image, estimated_gsd_cm, target_gsd_cm):
         output_height = int(input_image.height + (input_image.height * upscale_factor))
         new_size = (output_width, output_height)
 
-        new_im = input_image.resize(new_size)
-
-        print(
-            f"Downsampling operation produces an output image of size {new_im.size} \
-            from input image of {input_image.size}."
+        # when the GSDs differ by a whole-number factor, Pillow's box reduce() averages
+        # each k x k block in a single pass. The image is cropped to a multiple of k,
+        # so (like resize() below) any partial block at the edges is dropped.
+        ratio = float(target_gsd_cm) / estimated_gsd_cm
+        k = round(ratio)
+        if k >= 2 and abs(ratio - k) < 1e-3:
+            new_im = input_image.reduce(
+                k,
+                box=(0, 0, input_image.width // k * k, input_image.height // k * k),
+            )
+        else:
+            # bilinear is adequate for aerial imagery and cheaper than Pillow's
+            # default bicubic filter.
+            new_im = input_image.resize(new_size, Image.BILINEAR)
+
+        logger.debug(
+            "Downsampling operation produces an output image of size %s from input \
+image of %s.",
+            new_im.size, input_image.size,
         )
         return new_im
 
     else:
-        print(
-            f"Downsampling operation was initiated, but we estimate the input image's \
-            max GSD ({estimated_gsd_cm}) is greater than or equal to the API's target \
-            GSD ({target_gsd_cm}). No upsampling will be performed."
+        logger.info(
+            "Downsampling operation was initiated, but we estimate the input image's \
+max GSD (%s) is greater than or equal to the API's target GSD (%s). No upsampling \
+will be performed.",
+            estimated_gsd_cm, target_gsd_cm,
         )
         return None
 
 
-def _denormalize_coordinates(bbox, im_height, im_width):
+def _denormalize_coordinates(bboxes, im_height, im_width):
     """A simple funtion that takes normalized bounding box image coordinates (0-1.0)
     and converts to absolute image pixel coordinates. These bounding boxes should have
     Tensorflow's preferred coordinate order of (ymin, xmin, ymax, xmax). The return
     coordinates are in the same order.
 
+    All bounding boxes are denormalized at once with a single vectorized expression.
+
     Inputs:
-    - bbox: A list of floats representing the normalized bounding box coordinates.
-        This list should be in the coord. order of (ymin, xmin, ymax, xmax).
+    - bboxes: An array-like of floats of shape (num_bboxes, 4) representing the
+        normalized bounding box coordinates. Each row should be in the coord. order
+        of (ymin, xmin, ymax, xmax).
     - im_height: An integer representing the image height in pixels.
     - im_width: An integer representing the image width in pixels.
 
     Returns:
-    px_coords: A list of floats representing the absolute bounding box coordinates.
-        Coord order: (ymin, xmin, ymax, xmax).
+    px_coords: A np.ndarray of int32s of shape (num_bboxes, 4) representing the
+        absolute bounding box coordinates. Coord order: (ymin, xmin, ymax, xmax).
     """
 
     # this is set to Tensorflow Object Detection ordering (ymin, xmin, ymax, xmax)
-    ymin = bbox[0]
-    xmin = bbox[1]
-    ymax = bbox[2]
-    xmax = bbox[3]
+    scale = np.array([im_height, im_width, im_height, im_width], dtype=np.float64)
 
-    top = int(ymin * im_height)
-    left = int(xmin * im_width)
-    bottom = int(ymax * im_height)
-    right = int(xmax * im_width)
-
-    px_coords = [top, left, bottom, right]
-    # print("ymin, xmin, ymax, xmax")
-    # print(f"norm: {bbox}, denorm {px_coords}")
+    # astype() truncates toward zero, matching the previous per-coordinate int().
+    px_coords = (
+        np.asarray(bboxes, dtype=np.float64).reshape(-1, 4) * scale
+    ).astype(np.int32)
 
     return px_coords
 
@@ -624,41 +868,34 @@ def read_tf_label_map(label_map_path):
         (int:string)
     """
 
-    item_id = None
-    item_name = None
+    logger.debug("Reading label map: %s", label_map_path)
+    with open(label_map_path, "r") as label_map_file:
+        label_map_text = label_map_file.read()
+
+    # a single regex scan over the whole file. Each 'item { ... }' block is matched
+    # and its 'id:' and 'name:' fields are captured, in whichever order they appear.
     items = {}
+    for item_match in _LABEL_MAP_ITEM_RE.finditer(label_map_text):
+        item_body = item_match.group(1)
+        id_match = _LABEL_MAP_ID_RE.search(item_body)
+        name_match = _LABEL_MAP_NAME_RE.search(item_body)
 
-    print(label_map_path)
-    with open(label_map_path, "r") as label_map_file:
-        for line in label_map_file:
-            line.replace(" ", "")
-            if line == "item{":
-                pass
-            elif line == "}":
-                pass
-            elif "id:" in line:
-                item_id = int(line.split(":", 1)[1].strip())
-            elif "name:" in line:
-                item_name = line.split(":", 1)[1].replace("'", "").strip()
-
-            if item_id is not None and item_name is not None:
-                items[item_id] = item_name
-                item_id = None
-                item_name = None
+        if id_match is not None and name_match is not None:
+            items[int(id_match.group(1))] = name_match.group(1).strip()
 
     return items
 
 
 def pd_centerpoint(pt1, pt2):
     """ Calculates a centerpoint.
-    Designed for use in a pd.apply() statement.
+    Designed for use on whole columns (np.ndarray or pd.Series).
     """
-    return round(((pt1 + pt2) / 2))
+    return np.round((pt1 + pt2) / 2).astype(np.int64)
 
 
 def pd_dim(min_pt, max_pt):
     """ Calculates the distance between two points.
-    Designed for use in a pd.apply() statement.
+    Designed for use on whole columns (np.ndarray or pd.Series).
     """
     return (max_pt - min_pt)
 
@@ -673,70 +910,68 @@ def results_dict_to_dataframe(image_name, orig_results, label_map):
         This is most likely coming from reassemble_chip_results().
     - label_map: A dictionary mapping the class ID (int) to the class name (str).
     """
-    # working on a copy
-    results = orig_results.copy()
-
-    # split the bbox coordinates to individual lists (columns).
-    bbox_array = np.array(results["bboxes"], dtype=np.uint32)
-    ymin = bbox_array[:, 0].tolist()
-    xmin = bbox_array[:, 1].tolist()
-    ymax = bbox_array[:, 2].tolist()
-    xmax = bbox_array[:, 3].tolist()
-
-    results["y_row_top"] = ymin
-    results["x_col_left"] = xmin
-    results["y_row_bottom"] = ymax
-    results["x_col_right"] = xmax
-
-    # get the filename list (column) together.
-    filenames = [image_name] * len(results["classes"])
-    results["filename"] = filenames
-
-    # create a pandas dataframe.
-    raw_df = pd.DataFrame.from_dict(results)
-
-    # add a class name column. the .astype() is because the label_map dict gets crushed
-    # to all strings when passed from FastAPI to the Celery worker.
-    raw_df["class_name"] = raw_df["classes"]
-    raw_df.replace({"class_name": label_map}, inplace=True)
-
-    # beautify!
-    raw_df["class_id"] = raw_df["classes"]
-    raw_df["score"] = raw_df["scores"]
-
-    raw_df["y_center"] = raw_df.apply(
-        lambda row: pd_centerpoint(row["y_row_bottom"], row["y_row_top"]), axis=1
-    )
-    raw_df["x_center"] = raw_df.apply(
-        lambda row: pd_centerpoint(row["x_col_right"], row["x_col_left"]), axis=1
+    # gather the results into columnar numpy arrays. reshape() keeps the (N, 4)
+    # shape when an image has no detections at all.
+    bbox_array = np.asarray(orig_results["bboxes"], dtype=np.int32).reshape(-1, 4)
+    classes = np.asarray(orig_results["classes"], dtype=np.uint8)
+    scores = np.asarray(orig_results["scores"], dtype=np.float32)
+
+    # split the bbox coordinates to individual columns (views, no copies).
+    ymin = bbox_array[:, 0]
+    xmin = bbox_array[:, 1]
+    ymax = bbox_array[:, 2]
+    xmax = bbox_array[:, 3]
+
+    # map class ids to names through a categorical, so the label_map lookup runs
+    # once per distinct class rather than once per detection.
+    class_names = pd.Series(classes, dtype="category").map(label_map)
+
+    # build the dataframe in one shot, deriving the center/dimension columns from
+    # whole-column arithmetic rather than a row-wise pd.apply(). The columns are
+    # already typed arrays, so they are used as-is rather than copied.
+    ordered_df = pd.DataFrame(
+        {
+            "filename": image_name,
+            "class_name": class_names,
+            "class_id": classes,
+            "score": scores,
+            "y_row_top": ymin,
+            "x_col_left": xmin,
+            "y_row_bottom": ymax,
+            "x_col_right": xmax,
+            "y_center": pd_centerpoint(ymax, ymin),
+            "x_center": pd_centerpoint(xmax, xmin),
+            "y_height": pd_dim(ymin, ymax),
+            "x_width": pd_dim(xmin, xmax),
+        },
+        copy=False,
     )
 
-    raw_df["y_height"] = raw_df.apply(
-        lambda row: pd_dim(row["y_row_top"], row["y_row_bottom"]), axis=1
-    )
-    raw_df["x_width"] = raw_df.apply(
-        lambda row: pd_dim(row["x_col_left"], row["x_col_right"]), axis=1
-    )
+    return ordered_df
 
-    ordered_df = raw_df[
-        [
-            "filename", "class_name", "class_id", "score",
-            "y_row_top", "x_col_left", "y_row_bottom", "x_col_right",
-            "y_center", "x_center", "y_height", "x_width"
-        ]
-    ]
 
-    return ordered_df
+def _text_size(font, text):
+    """Returns the (width, height) of text rendered in font, in pixels. Uses
+    font.getbbox() where available (Pillow >= 8), falling back to the older
+    font.getsize() (removed in Pillow 10).
+    """
+    if hasattr(font, "getbbox"):
+        text_left, text_top, text_right, text_bottom = font.getbbox(text)
+        return text_right - text_left, text_bottom - text_top
 
+    return font.getsize(text)
 
-def plot_bboxes_on_image(image_path, labels, color_ramp, class_scheme, thickness=4):
+
+def plot_bboxes_on_image(image_array, labels, color_ramp, class_scheme, thickness=4):
     """A custom function to plot object detection bounding boxes on an image.
     This function is pretty basic. The only motivation to writing this was to
     remove the need for TF Object Detection API's heavy dependencies within the
     Celery geoprocessor.
 
     Inputs:
-    - image_path: A string representing the path to the image to be plotted.
+    - image_array: A np.ndarray of shape (height, width, 3) holding the RGB image to
+        be plotted. This should be the same (already decoded) image the bboxes were
+        predicted on, which avoids re-reading and re-decoding the image from disk.
     - labels: A dictionary which contains the keys "bboxes", "scores", and "classes".
         Each key's value should be a list of values for each bbox. This is most likely
         coming from reassemble_chip_results().
@@ -748,97 +983,252 @@ def plot_bboxes_on_image(image_path, labels, color_ramp, class_scheme, thickness
     - pil_im: the plotted image as a PIL Image.Image object.
     """
 
-    with Image.open(image_path, "r") as pil_im:
-        im_width, im_height = pil_im.size
-        print(f"Image size: {im_width}, {im_height}")
+    # fromarray() copies the RGB buffer, so the caller's array is left untouched.
+    pil_im = Image.fromarray(image_array)
+    im_width, im_height = pil_im.size
+    logger.debug("Image size: %s, %s", im_width, im_height)
+
+    draw = ImageDraw.Draw(pil_im)
+
+    # load the label font once per image, rather than once per bbox.
+    try:
+        font = ImageFont.truetype("arial.ttf", 24)
+    except IOError:
+        font = ImageFont.load_default()
+
+    # class IDs are small integers, so each bbox's color and label are resolved in
+    # one step by indexing lookup arrays with all of the bbox classes at once.
+    bbox_classes = np.asarray(labels["classes"], dtype=np.intp)
+    num_lookup_ids = int(bbox_classes.max()) + 1 if len(bbox_classes) > 0 else 0
+    color_lookup = np.empty(num_lookup_ids, dtype=object)
+    label_lookup = np.empty(num_lookup_ids, dtype=object)
+    for class_id in set(bbox_classes.tolist()):
+        color_lookup[class_id] = color_ramp[class_id]
+        label_lookup[class_id] = class_scheme[class_id]
+
+    bbox_colors = color_lookup[bbox_classes]
+    bbox_labels = label_lookup[bbox_classes]
+
+    for bbox, bbox_score, bbox_color, bbox_label in zip(
+        labels["bboxes"], labels["scores"], bbox_colors, bbox_labels
+    ):
+        # Tensorflow bbox order: (ymin, xmin, ymax, xmax)
+        # PIL and Tensorflow both use a top-left origin (0, 0). So top = ymin and bottom = ymax.
+        top, left, bottom, right = bbox
+
+        logger.debug("TL: %s, %s, BR: %s, %s", left, top, right, bottom)
+
+        # PIL uses a top-left origin (0, 0)
+        if thickness > 0:
+            draw.rectangle(
+                [(left, top), (right, bottom)], width=thickness, outline=bbox_color
+            )
 
-        draw = ImageDraw.Draw(pil_im)
+        display_string = f"{bbox_label}, {format(bbox_score, '.2f')}"
 
-        for i, bbox in enumerate(labels["bboxes"]):
-            # Tensorflow bbox order: (ymin, xmin, ymax, xmax)
-            # PIL and Tensorflow both use a top-left origin (0, 0). So top = ymin and bottom = ymax.
-            top, left, bottom, right = bbox
+        text_width, text_height = _text_size(font, display_string)
 
-            bbox_class = labels["classes"][i]
-            bbox_score = labels["scores"][i]
+        margin = np.ceil(0.05 * text_height)
+        draw.rectangle(
+            [
+                (left - margin, top),
+                (left + text_width + margin, top + text_height + margin),
+            ],
+            fill=bbox_color,
+        )
 
-            bbox_color = color_ramp[bbox_class]
-            bbox_label = class_scheme[bbox_class]
+        draw.text((left, top), display_string, fill="black", font=font)
 
-            print(f"TL: {left}, {top}, BR: {right}, {bottom}")
+    return pil_im
 
-            # PIL uses a top-left origin (0, 0)
-            if thickness > 0:
-                draw.rectangle(
-                    [(left, top), (right, bottom)], width=thickness, outline=bbox_color
-                )
-            try:
-                font = ImageFont.truetype("arial.ttf", 24)
-            except IOError:
-                font = ImageFont.load_default()
 
-            display_string = f"{bbox_label}, {format(bbox_score, '.2f')}"
+def _read_csv_rows(csv_path, out):
+    """Reads the raw bytes of a CSV file's rows (everything after its header) into
+    out, a writable buffer of exactly that size.
+    """
+    with open(csv_path, "rb") as csv_file:
+        csv_file.readline()
+        csv_file.readinto(out)
 
-            # Determine H/W with .GETBBOX()
-            text_left, text_top, text_right, text_bottom = font.getbbox(display_string)
-            text_width = text_right - text_left
-            text_height = text_bottom - text_top
-            print(f"left: {text_left}, top: {text_top}, right: {text_right}, bottom: {text_bottom}")
 
-            # Determine H/W with .GETSIZE() - used in later versions of PIL
-            #text_width, text_height = font.getsize(display_string)
-            #print(f"Text width: {text_width}, Text height: {text_height}")
+def _merge_csvs(header, csvs, csv_sizes, merged_csv_path):
+    """Merges CSV files that all share the given header (bytes) into a single CSV
+    file. csv_sizes holds each CSV's size in bytes.
+    """
+    # stack all CSVs into a single CSV. Every per-image CSV shares the same header,
+    # so the files' rows are simply concatenated under a single header. The merged
+    # buffer is allocated once (sized from the files' sizes) and each file's rows
+    # are read straight into their slice of it, so no per-file copies are made. The
+    # file reads are independent, so they run concurrently.
+    rows_sizes = [csv_size - len(header) for csv_size in csv_sizes]
+    rows_offsets = list(accumulate([len(header), *rows_sizes[:-1]]))
+
+    merged_csv = bytearray(len(header) + sum(rows_sizes))
+    merged_csv[: len(header)] = header
+    merged_view = memoryview(merged_csv)
+    # the reads are submitted largest first, so a large CSV is not left running
+    # alone at the end. Each read still fills its own slice, so the merged row order
+    # is unchanged.
+    read_jobs = sorted(
+        zip(csvs, rows_offsets, rows_sizes), key=lambda job: job[2], reverse=True
+    )
 
-            margin = np.ceil(0.05 * text_height)
-            draw.rectangle(
-                [
-                    (left - margin, top),
-                    (left + text_width + margin, top + text_height + margin),
-                ],
-                fill=bbox_color,
+    # the pool scales with the number of CSVs (one worker per file), capped at four
+    # in-flight reads per core to batch the small reads' syscall latency.
+    num_workers = max(1, min(cpu_count() * 4, len(csvs)))
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        list(
+            executor.map(
+                lambda job: _read_csv_rows(
+                    job[0], merged_view[job[1] : job[1] + job[2]]
+                ),
+                read_jobs,
             )
+        )
 
-            draw.text((left, top), display_string, fill="black", font=font)
+    # the merged rows are written out as-is, rather than being parsed into a
+    # dataframe and re-serialized.
+    with open(merged_csv_path, "wb") as merged_csv_file:
+        merged_csv_file.write(merged_csv)
 
-        return pil_im
 
+@lru_cache(maxsize=8)
+def _count_class_names(csv_signature):
+    """Counts the detections of each class name across the given per-image results
+    CSVs, returning a pd.Series sorted from the most to least common class. The
+    CSVs are streamed row by row into a Counter, so no dataframe is built.
 
-def collate_per_image_results(in_dir):
+    csv_signature is a tuple of (path, modification time (ns), size) tuples, one
+    per CSV. The counts are cached on it, so unchanged CSVs are not re-read, while
+    edits to any CSV are still picked up. Callers must not modify the returned
+    (cached) Series.
+    """
+    class_counts = Counter()
+    for csv_path, _, _ in csv_signature:
+        with open(csv_path, newline="") as csv_file:
+            # rows are read as plain lists and the class name is picked out by its
+            # column index, rather than building a dict for every row.
+            csv_rows = csv.reader(csv_file)
+            class_name_idx = next(csv_rows).index("class_name")
+            class_counts.update(row[class_name_idx] for row in csv_rows)
+
+    return pd.Series(class_counts, dtype=np.int64).sort_values(ascending=False)
+
+
+def _count_merged_class_names(merged_csv_path):
+    """Counts the detections of each class name in the merged results CSV, returning
+    a pd.Series sorted from the most to least common class. The parsed class names
+    are scoped to this function, so they are released as soon as it returns.
+    """
+    # pyarrow is only installed in the geoprocessor image (the client also imports
+    # this module), so it is imported here rather than at the top of the module.
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+
+    # only the class name column, which is all the counts need, is parsed (by
+    # pyarrow's multithreaded C++ CSV parser) from the freshly written (and so,
+    # cached) merged file. It is dictionary-encoded while parsing, so the class
+    # names never become Python strings.
+    class_names = pa_csv.read_csv(
+        merged_csv_path,
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=["class_name"],
+            column_types={"class_name": pa.dictionary(pa.int32(), pa.string())},
+            strings_can_be_null=True,
+        ),
+    ).column("class_name")
+
+    # count occurences of debris across all images with Arrow's value_counts kernel.
+    # The chunks are combined first, as value_counts is much slower on chunked
+    # dictionary arrays. Only the small (class name, count) result is converted.
+    value_counts = pc.value_counts(pc.drop_null(class_names.combine_chunks()))
+    debris_counts = pd.Series(
+        value_counts.field("counts").to_numpy(),
+        index=value_counts.field("values").dictionary_decode().to_pylist(),
+    ).sort_values(ascending=False)
+
+    return debris_counts
+
+
+def collate_per_image_results(in_dir, merged_csv_path=None):
     """This function collates the per-image inference results into merged
     results for the entire user submission.
-    All CSVs are merged via Pandas (for writing to CSV). Along the way we
-    tally each debris type and the cumulative sum of all debris types, which
-    is written as the final row of a final_counts dataframe (for writing to
-    CSV).
+    All CSVs are merged into a single CSV (written to merged_csv_path). Along the
+    way we tally each debris type and the cumulative sum of all debris types, which
+    is written as the final row of a final_counts dataframe (for writing to CSV).
+    If merged_csv_path is None, only the counts are computed.
 
     TODO: Bundle JSONS?
     Inputs:
     - in_dir: A string representing the path to the directory containing the
         per-image inference results.
+    - merged_csv_path (optional, default=None): A string representing the path the
+        merged CSV results are written to. If None, no merged CSV is written.
     Returns:
-    - final_df: A Pandas DataFrame containing the merged CSV results.
-    - final_counts: A pandas dataframe containing two columns which correspond
+    - debris_counts: A pandas series containing two columns which correspond
         to the debris type and the number of debris of that type respectively.
         The total debris (sum) is also included as the bottom row.
     """
-    # scan directory for CSV files
-    csvs = [join(in_dir, x) for x in listdir(in_dir) if x.endswith(".csv")]
-
-    # stack all CSVs into a single dataframe.
-    dfs = []
-    for target_csv in csvs:
-        target_df = pd.read_csv(target_csv)
-        dfs.append(target_df)
-    final_df = pd.concat(dfs, ignore_index=True)
-
-    # from that single dataframe, count occurences of debris across all images,
-    # sum the total, append the total, and prep a Pandas series for export to a CSV.
-    debris_counts = final_df["class_name"].value_counts()
-    debris_total = pd.Series(debris_counts.sum(), index=["total debris (sum)"])
-
-    counts = []
-    counts.append(debris_counts)
-    counts.append(debris_total)
-    final_counts = pd.concat(counts)
-
-    return final_df, final_counts
+    # scan directory for CSV files. scandir() entries carry their full path and file
+    # type, so no extra join() or stat() calls are needed.
+    with scandir(in_dir) as entries:
+        csv_entries = [
+            entry
+            for entry in entries
+            if entry.name.endswith(".csv") and entry.is_file()
+        ]
+
+    # images without any detections still get a (header-only) CSV. These hold no
+    # rows, so they are skipped by size rather than being read and parsed.
+    with open(csv_entries[0].path, "rb") as first_csv:
+        header = first_csv.readline()
+    csv_stats = {entry.path: entry.stat() for entry in csv_entries}
+    csvs = sorted(
+        csv_path
+        for csv_path, csv_stat in csv_stats.items()
+        if csv_stat.st_size > len(header)
+    )
+    csv_sizes = {csv_path: csv_stats[csv_path].st_size for csv_path in csvs}
+
+    if merged_csv_path is None:
+        # only the counts are wanted, so no merged CSV (or dataframe) is built. The
+        # counts are memoized on the CSVs' paths, modification times, and sizes
+        # (copied, as the total is appended below).
+        csv_signature = tuple(
+            (csv_path, csv_stats[csv_path].st_mtime_ns, csv_sizes[csv_path])
+            for csv_path in csvs
+        )
+        debris_counts = _count_class_names(csv_signature).copy()
+    else:
+        # the merge and the count each run in their own helper, so the merged CSV
+        # buffer is released before the class names are parsed and the parsed
+        # class names are released before the total is appended.
+        _merge_csvs(
+            header, csvs, [csv_sizes[csv_path] for csv_path in csvs], merged_csv_path
+        )
+        debris_counts = _count_merged_class_names(merged_csv_path)
+
+    # sum the total and append it (in place) to prep a Pandas series for export to a
+    # CSV.
+    debris_counts.loc["total debris (sum)"] = debris_counts.sum()
+
+    return debris_counts
+
+
+def iter_debris_counts(in_dir, merged_csv_path=None):
+    """A generator version of collate_per_image_results(), intended for streaming the
+    debris counts straight to a CSV writer.
+    Inputs:
+    - in_dir: A string representing the path to the directory containing the
+        per-image inference results.
+    - merged_csv_path (optional, default=None): A string representing the path the
+        merged CSV results are written to. If None, no merged CSV is written.
+    Yields:
+    - (debris type, count) tuples, from the most to least common debris type,
+        followed by ("total debris (sum)", total count).
+    """
+    debris_counts = collate_per_image_results(in_dir, merged_csv_path)
+
+    for debris_type, count in zip(debris_counts.index, debris_counts.to_numpy()):
+        yield debris_type, int(count)